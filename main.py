@@ -10,26 +10,32 @@ keeping them grouped in the Telegram channel.
 
 import os
 import re
+import io
 import csv
 import json
 import uuid
 import asyncio
-import zipfile
-import shutil
+import zlib
+import struct
+import time
 import logging
 import math
 from pathlib import Path
 from datetime import datetime
 
 import aiofiles
+from aiolimiter import AsyncLimiter
 from fastapi import FastAPI, File, Form, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from supabase import create_client, Client
 
-from telegram import Bot
+from telegram import Bot, InputFile
+from telegram.error import RetryAfter
 from telegram.request import HTTPXRequest
 
+from quran import load_quran_cached
+
 import random
 
 # ─────────────────────────────────────────────
@@ -58,8 +64,9 @@ SUPABASE_KEY       = os.environ["SUPABASE_KEY"]
 
 BATCH_SIZE_BYTES = 500 * 1024 * 1024        # 500 MB — trigger threshold
 CHUNK_SIZE_BYTES = 45 * 1024 * 1024         # 45 MB  — safe under 50 MB Bot API limit
+UPLOAD_PARALLEL  = 4                        # chunks in flight (and in RAM) at once
+COPY_BUF_BYTES   = 64 * 1024                # /submit streaming copy buffer
 TEMP_DIR         = Path("/tmp/quran_batch")
-QURAN_JSON_PATH  = Path("quran_full.json")
 
 # ─────────────────────────────────────────────
 # FastAPI App
@@ -78,100 +85,94 @@ app.add_middleware(
 # ─────────────────────────────────────────────
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+async def sb(query):
+    """Run a query builder's blocking .execute() off the event loop."""
+    return await asyncio.to_thread(query.execute)
+
 # ─────────────────────────────────────────────
 # Telegram Bot — standard Bot API (no local server)
 # ─────────────────────────────────────────────
-_bot_request = HTTPXRequest(
-    connection_pool_size=4,
-    connect_timeout=30.0,
-    read_timeout=120.0,
-    write_timeout=120.0,
-    pool_timeout=30.0,
-)
+def _make_bot_request() -> HTTPXRequest:
+    return HTTPXRequest(
+        connection_pool_size=8,
+        connect_timeout=30.0,
+        read_timeout=120.0,
+        write_timeout=120.0,
+        pool_timeout=30.0,
+    )
 
 bot: Bot = Bot(
     token=TELEGRAM_BOT_TOKEN,
-    request=_bot_request,
+    request=_make_bot_request(),
 )
 
+# Batch chunks alternate between two Bot instances (same token, separate
+# connection pools). Concurrency and rate are still gated for both together:
+# telegram_sem caps chunks in flight, telegram_limiter stays under the
+# ~20 uploads/min Telegram allows per channel.
+UPLOAD_BOTS: tuple[Bot, ...] = (
+    bot,
+    Bot(token=TELEGRAM_BOT_TOKEN, request=_make_bot_request()),
+)
+telegram_sem     = asyncio.Semaphore(UPLOAD_PARALLEL)
+telegram_limiter = AsyncLimiter(20, 60)
+
+async def send_document_limited(bot_: Bot, **kwargs):
+    """bot_.send_document under telegram_limiter, re-sending after a 429."""
+    while True:
+        async with telegram_limiter:
+            try:
+                return await bot_.send_document(**kwargs)
+            except RetryAfter as exc:
+                delay = exc.retry_after
+        log.warning(f"⏳ Telegram rate limit hit — retrying in {delay}s")
+        await asyncio.sleep(delay)
+
 # ─────────────────────────────────────────────
 # Temp directory
 # ─────────────────────────────────────────────
 TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
 # ─────────────────────────────────────────────
-# Arabic Text Cleaning  ← DO NOT MODIFY
-# ─────────────────────────────────────────────
-KEEP_PATTERN = re.compile(
-    r"[^\u0600-\u0605"
-    r"\u0610-\u061A"
-    r"\u061C"
-    r"\u0620-\u063A"
-    r"\u0640-\u065F"
-    r"\u0670-\u06DC"
-    r"\u06DF-\u06E8"
-    r"\u06EA-\u06ED"
-    r"\uFB50-\uFDFF"
-    r"\uFE70-\uFEFF"
-    r" ]"
-)
-
-def clean_text(raw: str) -> str:
-    raw = re.sub(
-        r"[\u06DD\u06DE\uFD3E\uFD3F\u0660-\u0669\u06F0-\u06F9()\[\]{}]",
-        "", raw,
-    )
-    raw = KEEP_PATTERN.sub("", raw)
-    raw = re.sub(r" +", " ", raw).strip()
-    return raw
+# Timestamps
+# ─────────────────────────────────────────────
+_iso_second = -1
+_iso_cached = ""
+
+def now_iso() -> str:
+    """UTC ISO-8601 timestamp at 1 s resolution, formatted once per second."""
+    global _iso_second, _iso_cached
+    t = int(time.time())
+    if t != _iso_second:
+        _iso_second = t
+        _iso_cached = datetime.utcfromtimestamp(t).isoformat() + "Z"
+    return _iso_cached
 
 # ─────────────────────────────────────────────
-# Quran Data Loader
+# Quran Data (see quran.py)
 # ─────────────────────────────────────────────
-def load_quran() -> list[dict]:
-    """
-    Accepts two JSON formats:
-
-    Format A — flat list:
-        [{"surah": 1, "ayah": 1, "text": "..."}, ...]
-
-    Format B — nested dict (your quran_full.json):
-        {"1": [{"number": 1, "text": "..."}, ...], "2": [...], ...}
-    """
-    if not QURAN_JSON_PATH.exists():
-        raise RuntimeError(
-            "quran_full.json not found. Place it in the repo root."
-        )
-    with open(QURAN_JSON_PATH, encoding="utf-8") as f:
-        raw = json.load(f)
-
-    # Format A — already a flat list
-    if isinstance(raw, list):
-        return raw
-
-    # Format B — nested dict keyed by surah number string
-    flat = []
-    for surah_str, ayahs in raw.items():
-        for ayah in ayahs:
-            flat.append({
-                "surah": int(surah_str),
-                "ayah":  ayah["number"],
-                "text":  ayah["text"],
-            })
-    flat.sort(key=lambda x: (x["surah"], x["ayah"]))
-    log.info(f"Converted nested dict → flat list: {len(flat)} ayahs")
-    return flat
-
-QURAN_DATA: list[dict] = []
+# Quran as parallel arrays (struct-of-arrays), filled at startup
+SURAHS:      tuple[int, ...]             = ()
+AYAHS:       tuple[int, ...]             = ()
+CLEAN_TEXTS: tuple[str, ...]             = ()
+WORDS:       tuple[tuple[str, ...], ...] = ()
 
 # ─────────────────────────────────────────────
 # App Lifecycle
 # ─────────────────────────────────────────────
 @app.on_event("startup")
 async def startup():
-    global QURAN_DATA
-    QURAN_DATA = load_quran()
-    log.info(f"✅ Quran loaded: {len(QURAN_DATA)} ayahs.")
+    global SURAHS, AYAHS, CLEAN_TEXTS, WORDS, _writer_task
+    SURAHS, AYAHS, CLEAN_TEXTS, WORDS = load_quran_cached()
+    log.info(f"✅ Quran loaded: {len(CLEAN_TEXTS)} ayahs.")
+    scan_batch_size()
+    load_manifest()
+    log.info(f"Pending batch: {get_batch_size() / 1_048_576:.2f} MB")
+    # Tolerant parse: vendor builds may add suffixes like "1.2.13-ng"
+    zlib_ver = re.match(r"\d+(?:\.\d+)*", zlib.ZLIB_RUNTIME_VERSION)
+    if zlib_ver and tuple(map(int, zlib_ver.group().split("."))) < (1, 2, 12):
+        log.warning(f"⚠️ zlib {zlib.ZLIB_RUNTIME_VERSION} is old — batch ZIP CRC-32 will be slow.")
+    _writer_task = asyncio.create_task(write_behind())
     try:
         me = await bot.get_me()
         log.info(f"✅ Telegram bot ready: @{me.username}")
@@ -180,6 +181,12 @@ async def startup():
 
 @app.on_event("shutdown")
 async def shutdown():
+    try:
+        await asyncio.wait_for(write_queue.join(), timeout=10)
+    except asyncio.TimeoutError:
+        log.error(f"❌ {write_queue.qsize()} queued recording(s) not flushed.")
+    if _writer_task:
+        _writer_task.cancel()
     log.info("Shutting down.")
 
 # ─────────────────────────────────────────────
@@ -188,42 +195,103 @@ async def shutdown():
 # ─────────────────────────────────────────────
 def get_random_task() -> dict:
     roll = random.random()
-    idx  = random.randint(0, len(QURAN_DATA) - 1)
-    ayah = QURAN_DATA[idx]
+    idx  = random.randint(0, len(CLEAN_TEXTS) - 1)
 
     if roll < 0.40:
         mode = "full_verse"
-        raw  = ayah["text"]
+        text = CLEAN_TEXTS[idx]
     elif roll < 0.70:
-        mode      = "bridging"
-        next_idx  = min(idx + 1, len(QURAN_DATA) - 1)
-        next_ayah = QURAN_DATA[next_idx]
-        words_curr = ayah["text"].split()
-        words_next = next_ayah["text"].split()
+        mode       = "bridging"
+        next_idx   = min(idx + 1, len(CLEAN_TEXTS) - 1)
+        words_curr = WORDS[idx]
+        words_next = WORDS[next_idx]
         tail = words_curr[max(0, len(words_curr) - 5):]
         head = words_next[:5]
-        raw  = " ".join(tail + head)
+        text = " ".join(filter(None, tail + head))
     else:
         mode  = "random_window"
-        words = ayah["text"].split()
+        words = WORDS[idx]
         wlen  = len(words)
         win   = min(random.randint(7, 15), wlen)
         start = random.randint(0, max(0, wlen - win))
-        raw   = " ".join(words[start : start + win])
+        text  = " ".join(filter(None, words[start : start + win]))
 
     return {
         "task_id": str(uuid.uuid4()),
-        "text":    clean_text(raw),
+        "text":    text,
         "mode":    mode,
-        "surah":   ayah["surah"],
-        "ayah":    ayah["ayah"],
+        "surah":   SURAHS[idx],
+        "ayah":    AYAHS[idx],
     }
 
 # ─────────────────────────────────────────────
 # Batch Size Helper
 # ─────────────────────────────────────────────
+# Running total of bytes written to TEMP_DIR since the last upload, plus
+# the size counted for each file so a re-submission replaces its old size
+# instead of adding to it. Only touched from the event loop with no await
+# in between, so no lock needed.
+_batch_bytes = 0
+_file_bytes: dict[str, int] = {}
+
+def scan_batch_size() -> None:
+    """Full walk of TEMP_DIR — only used at startup to recover the counter."""
+    with os.scandir(TEMP_DIR) as it:
+        for e in it:
+            # Same filter as upload_batch: only WAVs are counted and zipped
+            if e.is_file() and e.name.endswith(".wav"):
+                set_file_bytes(e.name, e.stat().st_size)
+
 def get_batch_size() -> int:
-    return sum(f.stat().st_size for f in TEMP_DIR.rglob("*") if f.is_file())
+    return _batch_bytes
+
+def set_file_bytes(name: str, size: int) -> None:
+    global _batch_bytes
+    _batch_bytes += size - _file_bytes.get(name, 0)
+    _file_bytes[name] = size
+
+def discard_file_bytes(name: str) -> None:
+    global _batch_bytes
+    _batch_bytes -= _file_bytes.pop(name, 0)
+
+# ─────────────────────────────────────────────
+# Pending Manifest
+# ─────────────────────────────────────────────
+# filename → transcript for every WAV in TEMP_DIR, so metadata.csv needs no
+# database reads. Each /submit appends one JSON line to a shadow file in
+# TEMP_DIR that is replayed on startup and rewritten after each upload.
+MANIFEST_PATH = TEMP_DIR / ".manifest.jsonl"
+
+pending_manifest: dict[str, str] = {}
+
+def load_manifest() -> None:
+    pending_manifest.clear()
+    if not MANIFEST_PATH.exists():
+        return
+    with open(MANIFEST_PATH, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue   # torn final line from a crash mid-append
+            pending_manifest[entry["filename"]] = entry["raw_transcript"]
+
+def rewrite_manifest() -> None:
+    """Replace the shadow file with the entries still pending."""
+    if not pending_manifest:
+        MANIFEST_PATH.unlink(missing_ok=True)
+        return
+    tmp = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        for filename, transcript in pending_manifest.items():
+            f.write(json.dumps({"filename": filename, "raw_transcript": transcript}, ensure_ascii=False) + "\n")
+    tmp.replace(MANIFEST_PATH)
+
+async def add_manifest_entry(filename: str, transcript: str) -> None:
+    pending_manifest[filename] = transcript
+    line = json.dumps({"filename": filename, "raw_transcript": transcript}, ensure_ascii=False)
+    async with aiofiles.open(MANIFEST_PATH, "a", encoding="utf-8") as f:
+        await f.write(line + "\n")
 
 # ─────────────────────────────────────────────
 # Upload Lock
@@ -231,81 +299,321 @@ def get_batch_size() -> int:
 upload_lock = asyncio.Lock()
 
 # ─────────────────────────────────────────────
-# ZIP Chunker
+# Write-behind Queue
 # ─────────────────────────────────────────────
-def split_file(src: Path, chunk_size: int) -> list[Path]:
+# /submit only enqueues its `recordings` row; a background writer inserts up
+# to WRITE_BATCH_MAX rows (or whatever arrived within WRITE_BATCH_WAIT s) in
+# one request and marks their tasks recorded with one `in` update.
+WRITE_BATCH_MAX  = 100
+WRITE_BATCH_WAIT = 0.5
+WRITE_RETRIES    = 3
+
+write_queue: asyncio.Queue = asyncio.Queue()
+_writer_task: asyncio.Task | None = None
+
+async def _with_retries(make_query, what: str) -> None:
+    """Execute a freshly built query, retrying with exponential backoff."""
+    for attempt in range(1, WRITE_RETRIES + 1):
+        try:
+            await sb(make_query())
+            return
+        except Exception as exc:
+            log.warning(f"⚠️ {what} failed (attempt {attempt}/{WRITE_RETRIES}): {exc}")
+            if attempt == WRITE_RETRIES:
+                raise
+            await asyncio.sleep(2 ** (attempt - 1))
+
+def _upsert_recordings(records: list[dict]):
+    # Upsert on task_id so re-running a write that already committed
+    # (e.g. a timeout after the insert landed) is a no-op, not a duplicate
+    return supabase.table("recordings").upsert(records, on_conflict="task_id")
+
+async def flush_writes(records: list[dict]) -> None:
+    # A re-submitted task only needs its latest recording (and one status
+    # update) written
+    records = list({r["task_id"]: r for r in records}.values())
+
+    # Clients already got their 200, so a failed flush must not drop rows.
+    # The two statements are retried separately; the upsert first in bulk …
+    try:
+        await _with_retries(
+            lambda: _upsert_recordings(records),
+            f"Write-behind upsert of {len(records)} recording(s)",
+        )
+    except Exception:
+        # … then row by row, so one bad row cannot take the rest down with it
+        written = []
+        for record in records:
+            try:
+                await sb(_upsert_recordings([record]))
+                written.append(record)
+            except Exception as exc:
+                log.error(f"❌ Recording lost for task {record['task_id']}: {exc} — {record}")
+        records = written
+    if not records:
+        return
+
+    task_ids = [r["task_id"] for r in records]
+    try:
+        await _with_retries(
+            lambda: supabase.table("tasks")
+            .update({"status": "recorded"})
+            .in_("task_id", task_ids),
+            f"Marking {len(task_ids)} task(s) recorded",
+        )
+    except Exception as exc:
+        log.error(f"❌ Tasks left unmarked (recordings are saved): {task_ids} — {exc}")
+        return
+    log.info(f"Flushed {len(records)} recording(s) to Supabase")
+
+async def write_behind() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        records  = [await write_queue.get()]
+        deadline = loop.time() + WRITE_BATCH_WAIT
+        while len(records) < WRITE_BATCH_MAX:
+            try:
+                records.append(await asyncio.wait_for(
+                    write_queue.get(), deadline - loop.time()
+                ))
+            except asyncio.TimeoutError:
+                break
+        await flush_writes(records)
+        for _ in records:
+            write_queue.task_done()
+
+# ─────────────────────────────────────────────
+# Streaming ZIP (STORE) Writer
+# ─────────────────────────────────────────────
+# The batch ZIP is never materialised: local headers, raw WAV bytes and the
+# central directory are emitted straight into ≤45 MB upload chunks. Sizes and
+# CRC-32 go into a data descriptor after each entry (general-purpose flag bit
+# 3), so nothing has to be seeked back and patched.
+ZIP_LOCAL_HEADER    = struct.Struct("<IHHHHHIIIHH")
+ZIP_DATA_DESCRIPTOR = struct.Struct("<IIII")
+ZIP_CENTRAL_HEADER  = struct.Struct("<IHHHHHHIIIHHHHHII")
+ZIP_END_RECORD      = struct.Struct("<IHHHHIIH")
+ZIP_VERSION         = 20                     # 2.0 — needed for data descriptors
+ZIP_STORED          = 0
+ZIP_FLAG_DESCRIPTOR = 0x0008
+ZIP_FLAG_UTF8       = 0x0800
+ZIP32_MAX_SIZE      = 0xFFFFFFFF             # no ZIP64: offsets are 32-bit …
+ZIP32_MAX_ENTRIES   = 0xFFFF                 # … and entry counts 16-bit
+ZIP_READ_BLOCK      = 1024 * 1024            # copy + crc32 stride (~4 GB/s crc)
+
+
+class ChunkAccumulator:
     """
-    Split src into ≤chunk_size byte parts.
-    Returns list of part paths: src.part001, src.part002, …
+    Fixed-size buffer that cuts an arbitrary byte stream into chunk_size parts.
+    The same bytearray is refilled for every chunk; completed chunks are
+    copied out once into `ready` for the uploader to drain.
     """
-    parts   = []
-    part_no = 1
-    with open(src, "rb") as f:
-        while True:
-            data = f.read(chunk_size)
-            if not data:
-                break
-            part_path = src.with_suffix(f".part{part_no:03d}")
-            part_path.write_bytes(data)
-            parts.append(part_path)
-            part_no += 1
-    return parts
+
+    def __init__(self, chunk_size: int):
+        self.buf   = bytearray(chunk_size)
+        self.view  = memoryview(self.buf)
+        self.pos   = 0
+        self.ready: list[bytes] = []
+
+    def write(self, data) -> None:
+        data = memoryview(data)
+        while data:
+            n = min(len(self.buf) - self.pos, len(data))
+            self.view[self.pos : self.pos + n] = data[:n]
+            self.pos += n
+            data = data[n:]
+            if self.pos == len(self.buf):
+                self.ready.append(self.view.tobytes())
+                self.pos = 0
+
+    def flush(self) -> None:
+        if self.pos:
+            self.ready.append(self.view[: self.pos].tobytes())
+            self.pos = 0
+
+    def drain(self):
+        while self.ready:
+            yield self.ready.pop(0)
+
+
+def _dos_datetime(ts: float) -> tuple[int, int]:
+    t = time.localtime(ts)
+    year = max(t.tm_year, 1980)
+    dos_date = (year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday
+    dos_time = t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+    return dos_time, dos_date
+
+
+# An entry's contents: a file on disk, or bytes built in memory
+ZipSource = Path | os.DirEntry | bytes
+
+def _source_size(src: ZipSource) -> int:
+    return len(src) if isinstance(src, bytes) else src.stat().st_size
+
+
+def zip_entry_size(arcname: str, size: int) -> int:
+    """Bytes one entry adds to the archive: headers, data and descriptor."""
+    name_len = len(arcname.encode("utf-8"))
+    return (
+        ZIP_LOCAL_HEADER.size + name_len
+        + size
+        + ZIP_DATA_DESCRIPTOR.size
+        + ZIP_CENTRAL_HEADER.size + name_len
+    )
+
+
+def zip_stored_size(entries: list[tuple[str, ZipSource]]) -> int:
+    """Exact byte length of the archive iter_zip_chunks() will emit."""
+    return ZIP_END_RECORD.size + sum(
+        zip_entry_size(arcname, _source_size(src)) for arcname, src in entries
+    )
+
+
+def iter_zip_chunks(entries: list[tuple[str, ZipSource]], chunk_size: int):
+    """
+    Yield (part_no, bytes) chunks of a STORE-only ZIP containing `entries`
+    (arcname, source), reading each file exactly once.
+    """
+    acc        = ChunkAccumulator(chunk_size)
+    block_buf  = bytearray(ZIP_READ_BLOCK)
+    block_view = memoryview(block_buf)
+    offset     = 0
+    central    = []
+    part_no    = 1
+
+    def emit(data) -> None:
+        nonlocal offset
+        acc.write(data)
+        offset += len(data)
+
+    for arcname, src in entries:
+        name  = arcname.encode("utf-8")
+        flags = ZIP_FLAG_DESCRIPTOR | (0 if name.isascii() else ZIP_FLAG_UTF8)
+        in_memory = isinstance(src, bytes)
+        dos_time, dos_date = _dos_datetime(time.time() if in_memory else src.stat().st_mtime)
+        header_offset = offset
+
+        emit(ZIP_LOCAL_HEADER.pack(
+            0x04034B50, ZIP_VERSION, flags, ZIP_STORED,
+            dos_time, dos_date, 0, 0, 0, len(name), 0,
+        ))
+        emit(name)
+
+        if in_memory:
+            crc  = zlib.crc32(src)
+            size = len(src)
+            emit(src)
+        else:
+            # readinto() one reused block buffer — no per-block bytes objects.
+            # Not mmap: /submit may truncate a re-submitted WAV while this
+            # generator is suspended, and touching mapped pages past the new
+            # EOF kills the process with SIGBUS. Size and CRC therefore come
+            # from the bytes actually read.
+            crc  = 0
+            size = 0
+            with open(src, "rb") as f:
+                while n := f.readinto(block_buf):
+                    with block_view[:n] as block:
+                        crc = zlib.crc32(block, crc)
+                        emit(block)
+                    size += n
+                    for chunk in acc.drain():
+                        yield part_no, chunk
+                        part_no += 1
+
+        emit(ZIP_DATA_DESCRIPTOR.pack(0x08074B50, crc, size, size))
+        central.append(ZIP_CENTRAL_HEADER.pack(
+            0x02014B50, ZIP_VERSION, ZIP_VERSION, flags, ZIP_STORED,
+            dos_time, dos_date, crc, size, size, len(name), 0, 0, 0, 0,
+            0o100644 << 16, header_offset,
+        ) + name)
+
+    cd_offset = offset
+    for record in central:
+        emit(record)
+    emit(ZIP_END_RECORD.pack(
+        0x06054B50, 0, 0, len(central), len(central),
+        offset - cd_offset, cd_offset, 0,
+    ))
+
+    acc.flush()
+    for chunk in acc.drain():
+        yield part_no, chunk
+        part_no += 1
 
 # ─────────────────────────────────────────────
 # Batch Upload
 # ─────────────────────────────────────────────
 async def upload_batch():
     """
-    1. Write metadata.csv  (UTF-8-BOM)
-    2. ZIP with STORE compression
-    3. Split ZIP into ≤45 MB chunks
+    1. Build metadata.csv in memory  (UTF-8-BOM)
+    2. Lay out a STORE-only ZIP of TEMP_DIR
+    3. Stream the ZIP in ≤45 MB chunks (no ZIP or part files on disk)
     4. Send each chunk as a Telegram document
     5. Log in Supabase
-    6. Clear TEMP_DIR
+    6. Remove the uploaded WAVs from TEMP_DIR
     """
-    timestamp = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    zip_path  = Path(f"/tmp/batch_{timestamp}.zip")
-    meta_path = TEMP_DIR / "metadata.csv"
-
-    # ── 1. metadata.csv ──────────────────────────────────────────────
-    rows: list[dict] = []
-    for wav in sorted(TEMP_DIR.glob("*.wav")):
-        task_id = wav.stem
-        resp = (
-            supabase.table("recordings")
-            .select("transcript")
-            .eq("task_id", task_id)
-            .single()
-            .execute()
+    timestamp  = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    batch_name = f"batch_{timestamp}.zip"
+
+    # One directory walk; DirEntry caches the readdir type and the stat()
+    # that zip_stored_size() and the ZIP writer both need.
+    with os.scandir(TEMP_DIR) as it:
+        wavs = sorted(
+            (e for e in it if e.is_file() and e.name.endswith(".wav")),
+            key=lambda e: e.name,
         )
-        transcript = resp.data["transcript"] if resp.data else ""
-        rows.append({"filename": wav.name, "raw_transcript": transcript})
 
-    with open(meta_path, "w", encoding="utf-8-sig", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=["filename", "raw_transcript"])
+    # The ZIP writer has no ZIP64 support, so the archive must stay within
+    # 4 GiB and 65535 entries. This is checked before anything is sent;
+    # WAVs that don't fit stay in TEMP_DIR for the next batch.
+    found = len(wavs)
+    wavs  = wavs[: ZIP32_MAX_ENTRIES - 1]   # one entry is metadata.csv
+    while True:
+        # ── 1. metadata.csv ──────────────────────────────────────────
+        rows: list[dict] = [
+            {"filename": wav.name, "raw_transcript": pending_manifest.get(wav.name, "")}
+            for wav in wavs
+        ]
+
+        buf    = io.StringIO(newline="")
+        writer = csv.DictWriter(buf, fieldnames=["filename", "raw_transcript"])
         writer.writeheader()
         writer.writerows(rows)
+        metadata_csv = buf.getvalue().encode("utf-8-sig")
 
+        # ── 2. ZIP layout (STORE) ────────────────────────────────────
+        entries  = sorted(
+            [("metadata.csv", metadata_csv)] + [(wav.name, wav) for wav in wavs],
+            key=lambda entry: entry[0],
+        )
+        zip_size = zip_stored_size(entries)
+        if zip_size <= ZIP32_MAX_SIZE:
+            break
+        excess = zip_size - ZIP32_MAX_SIZE
+        while excess > 0:
+            wav = wavs.pop()
+            excess -= zip_entry_size(wav.name, wav.stat().st_size)
+
+    if len(wavs) < found:
+        log.warning(f"⚠️ ZIP limit: {found - len(wavs)} WAV(s) deferred to the next batch.")
     log.info(f"metadata.csv: {len(rows)} rows")
 
-    # ── 2. ZIP with STORE ─────────────────────────────────────────────
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) as zf:
-        for item in sorted(TEMP_DIR.iterdir()):
-            zf.write(item, item.name)
+    zip_size_mb = zip_size / 1_048_576
+    log.info(f"ZIP: {batch_name} ({zip_size_mb:.1f} MB)")
 
-    zip_size_mb = zip_path.stat().st_size / 1_048_576
-    log.info(f"ZIP: {zip_path.name} ({zip_size_mb:.1f} MB)")
+    # ── 3. Stream in ≤45 MB chunks ───────────────────────────────────
+    total_parts = max(1, math.ceil(zip_size / CHUNK_SIZE_BYTES))
+    log.info(f"Streaming in {total_parts} chunk(s)")
 
-    # ── 3. Split into ≤45 MB chunks ───────────────────────────────────
-    parts      = split_file(zip_path, CHUNK_SIZE_BYTES)
-    total_parts = len(parts)
-    log.info(f"Split into {total_parts} chunk(s)")
+    # ── 4. Upload chunks (part 1 first, then ≤UPLOAD_PARALLEL at once) ─
+    chunks = iter_zip_chunks(entries, CHUNK_SIZE_BYTES)
+    tasks: list[asyncio.Task] = []
 
-    # ── 4. Upload each chunk ──────────────────────────────────────────
-    first_message_id: int | None = None
-    try:
-        for i, part in enumerate(parts, 1):
-            part_mb = part.stat().st_size / 1_048_576
+    async def send_part(i: int, chunk: bytes, reply_to: int | None):
+        try:
+            part_name = f"batch_{timestamp}.part{i:03d}"
+            part_mb   = len(chunk) / 1_048_576
 
             if i == 1:
                 caption = (
@@ -314,52 +622,91 @@ async def upload_batch():
                     f"🗂 Part {i}/{total_parts}"
                 )
             else:
-                caption = f"🗂 Part {i}/{total_parts} — `{part.name}` ({part_mb:.1f} MB)"
+                caption = f"🗂 Part {i}/{total_parts} — `{part_name}` ({part_mb:.1f} MB)"
 
             log.info(f"Uploading part {i}/{total_parts} ({part_mb:.1f} MB)…")
 
-            with open(part, "rb") as pf:
-                msg = await bot.send_document(
-                    chat_id=TELEGRAM_CHANNEL,
-                    document=pf,
-                    filename=part.name,
-                    caption=caption,
-                    parse_mode="Markdown",
-                    # Reply to the first chunk so all parts are grouped
-                    reply_to_message_id=first_message_id if i > 1 else None,
-                    read_timeout=120,
-                    write_timeout=120,
-                )
+            msg = await send_document_limited(
+                UPLOAD_BOTS[i % len(UPLOAD_BOTS)],
+                chat_id=TELEGRAM_CHANNEL,
+                document=InputFile(chunk, filename=part_name),
+                caption=caption,
+                parse_mode="Markdown",
+                # Reply to the first chunk so all parts are grouped
+                reply_to_message_id=reply_to,
+                read_timeout=120,
+                write_timeout=120,
+            )
+            log.info(f"✅ Part {i}/{total_parts} uploaded.")
+            return msg
+        except Exception as exc:
+            log.error(f"❌ Part {i}/{total_parts} failed: {exc}")
+            raise
 
-            if i == 1:
-                first_message_id = msg.message_id
+    try:
+        # Part 1 must land first — its message_id is the reply target
+        await telegram_sem.acquire()
+        try:
+            first_msg = await send_part(*next(chunks), None)
+        finally:
+            telegram_sem.release()
 
-            part.unlink()   # delete chunk after successful upload
-            log.info(f"✅ Part {i}/{total_parts} uploaded.")
+        while True:
+            # Acquire before pulling the next chunk so at most
+            # UPLOAD_PARALLEL chunks are ever held in memory.
+            await telegram_sem.acquire()
+            for t in tasks:
+                if t.done() and t.exception():
+                    telegram_sem.release()
+                    raise t.exception()
+            try:
+                part = next(chunks, None)
+            except Exception:
+                telegram_sem.release()   # e.g. OSError reading a WAV
+                raise
+            if part is None:
+                telegram_sem.release()
+                break
+            task = asyncio.create_task(send_part(*part, first_msg.message_id))
+            # Released on completion *or* cancellation — the semaphore is
+            # shared across batches, so a cancelled part must not leak a slot.
+            task.add_done_callback(lambda _: telegram_sem.release())
+            tasks.append(task)
+
+        await asyncio.gather(*tasks)
 
     except Exception as exc:
-        log.error(f"❌ Upload failed on part {i}: {exc} — temp dir preserved for retry.")
-        # Clean up any remaining part files
-        for p in parts:
-            p.unlink(missing_ok=True)
-        zip_path.unlink(missing_ok=True)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        log.error(f"❌ Upload failed: {exc} — temp dir preserved for retry.")
         return
 
     # ── 5. Log in Supabase ────────────────────────────────────────────
-    supabase.table("batches").insert({
-        "batch_name":  zip_path.name,
+    await sb(supabase.table("batches").insert({
+        "batch_name":  batch_name,
         "file_count":  len(rows),
         "size_mb":     round(zip_size_mb, 2),
         "parts":       total_parts,
-        "uploaded_at": datetime.utcnow().isoformat(),
+        "uploaded_at": now_iso(),
         "status":      "uploaded",
-    }).execute()
-
-    # ── 6. Clear temp dir ─────────────────────────────────────────────
-    zip_path.unlink(missing_ok=True)
-    shutil.rmtree(TEMP_DIR)
-    TEMP_DIR.mkdir(parents=True)
-    log.info("🧹 Temp dir cleared. Ready for next batch.")
+    }))
+
+    # ── 6. Remove uploaded WAVs ───────────────────────────────────────
+    # Only what went into this ZIP — deferred WAVs and ones submitted
+    # while the upload ran stay for the next batch.
+    for wav in wavs:
+        Path(wav.path).unlink(missing_ok=True)
+        discard_file_bytes(wav.name)
+        pending_manifest.pop(wav.name, None)
+    rewrite_manifest()
+    log.info(f"🧹 {len(wavs)} uploaded WAV(s) removed. Ready for next batch.")
+
+async def locked_upload():
+    """Run upload_batch() unless another upload already drained the batch."""
+    async with upload_lock:
+        if get_batch_size() >= BATCH_SIZE_BYTES:
+            await upload_batch()
 
 # ─────────────────────────────────────────────
 # FastAPI Endpoints
@@ -367,14 +714,14 @@ async def upload_batch():
 @app.get("/get_task")
 async def get_task():
     task = get_random_task()
-    supabase.table("tasks").insert({
+    await sb(supabase.table("tasks").insert({
         "task_id": task["task_id"],
         "text":    task["text"],
         "mode":    task["mode"],
         "surah":   task["surah"],
         "ayah":    task["ayah"],
         "status":  "pending",
-    }).execute()
+    }))
     return task
 
 
@@ -389,24 +736,29 @@ async def submit(
         raise HTTPException(400, detail=f"Only WAV accepted (got {audio.content_type}).")
 
     dest = TEMP_DIR / f"{task_id}.wav"
+    written = 0
     async with aiofiles.open(dest, "wb") as f:
-        await f.write(await audio.read())
-
-    supabase.table("recordings").insert({
+        # Copy in 64 KB pieces so RAM per upload is bounded, not file-sized
+        while chunk := await audio.read(COPY_BUF_BYTES):
+            await f.write(chunk)
+            written += len(chunk)
+    # Count what was written, not a stat() after the awaits — the file may
+    # already be gone (upload cleanup) or rewritten by a concurrent submit
+    set_file_bytes(dest.name, written)
+    await add_manifest_entry(dest.name, transcript)
+
+    await write_queue.put({
         "task_id":    task_id,
         "filename":   dest.name,
         "transcript": transcript,
-        "created_at": datetime.utcnow().isoformat(),
-    }).execute()
-    supabase.table("tasks").update({"status": "recorded"}).eq("task_id", task_id).execute()
+        "created_at": now_iso(),
+    })
 
     batch_bytes = get_batch_size()
     log.info(f"Batch: {batch_bytes / 1_048_576:.2f} MB")
 
-    if batch_bytes >= BATCH_SIZE_BYTES:
-        async with upload_lock:
-            if get_batch_size() >= BATCH_SIZE_BYTES:
-                asyncio.create_task(upload_batch())
+    if batch_bytes >= BATCH_SIZE_BYTES and not upload_lock.locked():
+        asyncio.create_task(locked_upload())
 
     return JSONResponse({
         "status":   "ok",
@@ -418,12 +770,13 @@ async def submit(
 @app.get("/stats")
 async def stats():
     batch_bytes = get_batch_size()
-    recordings  = supabase.table("recordings").select("task_id", count="exact").execute()
-    batches     = (
-        supabase.table("batches")
-        .select("*")
-        .order("uploaded_at", desc=True)
-        .execute()
+    recordings, batches = await asyncio.gather(
+        sb(supabase.table("recordings").select("task_id", count="exact")),
+        sb(
+            supabase.table("batches")
+            .select("*")
+            .order("uploaded_at", desc=True)
+        ),
     )
     return {
         "current_batch_mb":   round(batch_bytes / 1_048_576, 2),